@@ -36,6 +36,9 @@ class GiftCardQueryset(models.QuerySet):
             is_active=True,
         )
 
+    def with_fulfillment(self):
+        return self.select_related("fulfillment_line", "fulfillment_line__order_line")
+
 
 class GiftCard(ModelWithMetadata):
     code = models.CharField(max_length=16, unique=True, db_index=True)
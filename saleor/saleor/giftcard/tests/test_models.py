@@ -0,0 +1,16 @@
+from ..models import GiftCard
+
+
+def test_gift_card_with_fulfillment(gift_card, fulfillment, django_assert_num_queries):
+    # given
+    fulfillment_line = fulfillment.lines.first()
+    gift_card.fulfillment_line = fulfillment_line
+    gift_card.save(update_fields=["fulfillment_line"])
+
+    # when
+    with django_assert_num_queries(1):
+        gift_cards = list(GiftCard.objects.with_fulfillment())
+        order_lines = [card.fulfillment_line.order_line for card in gift_cards]
+
+    # then
+    assert order_lines == [fulfillment_line.order_line]
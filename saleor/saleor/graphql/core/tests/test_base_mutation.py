@@ -2,11 +2,13 @@ from unittest import mock
 
 import graphene
 import pytest
+from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ImproperlyConfigured
-from graphql import GraphQLError
+from graphql import GraphQLError, execute, parse, validate
 from graphql.execution import ExecutionResult
 
 from saleor.core.permissions import ProductPermissions
+from saleor.plugins.manager import get_plugins_manager
 from saleor.plugins.tests.sample_plugins import PluginSample
 
 from ...product import types as product_types
@@ -66,6 +68,41 @@ schema = graphene.Schema(
     mutation=Mutations, types=[product_types.Product, product_types.ProductVariant]
 )
 
+# Parsed and validated documents, keyed by query string
+_PARSED = {}
+
+
+def _exec(query, **kwargs):
+    """Execute the query against the test schema, parsing it only once."""
+    document = _PARSED.get(query)
+    if document is None:
+        document = parse(query)
+        errors = validate(schema, document)
+        assert not errors, errors
+        _PARSED[query] = document
+    return execute(schema, document, **kwargs)
+
+
+def _reset_perm_cache(user):
+    # drop the permissions cached on the user by the authentication backends
+    for attr in ("_perm_cache", "_effective_permissions_cache"):
+        user.__dict__.pop(attr, None)
+    user._effective_permissions = None
+
+
+@pytest.fixture
+def product_global_id(product):
+    return graphene.Node.to_global_id("Product", product.pk)
+
+
+@pytest.fixture
+def sample_plugin_context(settings, plugin_configuration):
+    settings.PLUGINS = [
+        "saleor.plugins.tests.sample_plugins.PluginSample",
+    ]
+    params = {"user": AnonymousUser(), "app": None, "plugins": get_plugins_manager()}
+    return graphene.types.Context(**params)
+
 
 def test_mutation_without_description_raises_error():
     with pytest.raises(ImproperlyConfigured):
@@ -101,21 +138,16 @@ TEST_MUTATION = """
 """
 
 
-def test_resolve_id(product, schema_context, channel_USD):
-    product_id = graphene.Node.to_global_id("Product", product.pk)
-    variables = {"productId": product_id, "channel": channel_USD.slug}
-    result = schema.execute(
-        TEST_MUTATION, variables=variables, context_value=schema_context
-    )
+def test_resolve_id(product, product_global_id, schema_context, channel_USD):
+    variables = {"productId": product_global_id, "channel": channel_USD.slug}
+    result = _exec(TEST_MUTATION, variables=variables, context_value=schema_context)
     assert not result.errors
     assert result.data["test"]["name"] == product.name
 
 
 def test_user_error_nonexistent_id(schema_context, channel_USD):
     variables = {"productId": "not-really", "channel": channel_USD.slug}
-    result = schema.execute(
-        TEST_MUTATION, variables=variables, context_value=schema_context
-    )
+    result = _exec(TEST_MUTATION, variables=variables, context_value=schema_context)
     assert not result.errors
     user_errors = result.data["test"]["errors"]
     assert user_errors
@@ -123,8 +155,9 @@ def test_user_error_nonexistent_id(schema_context, channel_USD):
     assert user_errors[0]["message"] == "Couldn't resolve id: not-really."
 
 
-def test_mutation_custom_errors_default_value(product, schema_context, channel_USD):
-    product_id = graphene.Node.to_global_id("Product", product.pk)
+def test_mutation_custom_errors_default_value(
+    product_global_id, schema_context, channel_USD
+):
     query = """
         mutation testMutation($productId: ID!, $channel: String) {
             testWithCustomErrors(productId: $productId, channel: $channel) {
@@ -140,8 +173,8 @@ def test_mutation_custom_errors_default_value(product, schema_context, channel_U
             }
         }
     """
-    variables = {"productId": product_id, "channel": channel_USD.slug}
-    result = schema.execute(query, variables=variables, context_value=schema_context)
+    variables = {"productId": product_global_id, "channel": channel_USD.slug}
+    result = _exec(query, variables=variables, context_value=schema_context)
     assert result.data["testWithCustomErrors"]["errors"] == []
     assert result.data["testWithCustomErrors"]["customErrors"] == []
 
@@ -154,9 +187,7 @@ def test_user_error_id_of_different_type(product, schema_context, channel_USD):
     variant_id = graphene.Node.to_global_id("ProductVariant", variant.pk)
 
     variables = {"productId": variant_id, "channel": channel_USD.slug}
-    result = schema.execute(
-        TEST_MUTATION, variables=variables, context_value=schema_context
-    )
+    result = _exec(TEST_MUTATION, variables=variables, context_value=schema_context)
     assert not result.errors
     user_errors = result.data["test"]["errors"]
     assert user_errors
@@ -171,32 +202,21 @@ def test_get_node_or_error_returns_null_for_empty_id():
 
 
 def test_mutation_plugin_perform_mutation_handles_graphql_error(
-    request,
-    settings,
-    plugin_configuration,
-    product,
+    monkeypatch,
+    product_global_id,
+    sample_plugin_context,
     channel_USD,
 ):
     """Ensure when the mutation calls the method 'perform_mutation' on plugins,
     the returned error "GraphQLError" is properly returned and transformed into a dict
     """
-    settings.PLUGINS = [
-        "saleor.plugins.tests.sample_plugins.PluginSample",
-    ]
-
-    schema_context = request.getfixturevalue("schema_context")
+    variables = {"productId": product_global_id, "channel": channel_USD.slug}
 
-    product_id = graphene.Node.to_global_id("Product", product.pk)
-    variables = {"productId": product_id, "channel": channel_USD.slug}
-
-    with mock.patch.object(
-        PluginSample,
-        "perform_mutation",
-        return_value=GraphQLError("My Custom Error"),
-    ):
-        result = schema.execute(
-            TEST_MUTATION, variables=variables, context_value=schema_context
-        )
+    error = GraphQLError("My Custom Error")
+    monkeypatch.setattr(PluginSample, "perform_mutation", lambda *args, **kw: error)
+    result = _exec(
+        TEST_MUTATION, variables=variables, context_value=sample_plugin_context
+    )
     assert result.to_dict() == {
         "data": {"test": None},
         "errors": [
@@ -210,32 +230,25 @@ def test_mutation_plugin_perform_mutation_handles_graphql_error(
 
 
 def test_mutation_plugin_perform_mutation_handles_custom_execution_result(
-    request,
-    settings,
-    plugin_configuration,
-    product,
+    monkeypatch,
+    product_global_id,
+    sample_plugin_context,
     channel_USD,
 ):
     """Ensure when the mutation calls the method 'perform_mutation' on plugins,
     if a "ExecutionResult" object is returned, then the GraphQL response contains it
     """
-    settings.PLUGINS = [
-        "saleor.plugins.tests.sample_plugins.PluginSample",
-    ]
-
-    schema_context = request.getfixturevalue("schema_context")
-
-    product_id = graphene.Node.to_global_id("Product", product.pk)
-    variables = {"productId": product_id, "channel": channel_USD.slug}
+    variables = {"productId": product_global_id, "channel": channel_USD.slug}
 
-    with mock.patch.object(
-        PluginSample,
-        "perform_mutation",
-        return_value=ExecutionResult(data={}, errors=[GraphQLError("My Custom Error")]),
-    ):
-        result = schema.execute(
-            TEST_MUTATION, variables=variables, context_value=schema_context
-        )
+    execution_result = ExecutionResult(
+        data={}, errors=[GraphQLError("My Custom Error")]
+    )
+    monkeypatch.setattr(
+        PluginSample, "perform_mutation", lambda *args, **kw: execution_result
+    )
+    result = _exec(
+        TEST_MUTATION, variables=variables, context_value=sample_plugin_context
+    )
     assert result.to_dict() == {
         "data": {"test": None},
         "errors": [
@@ -248,18 +261,11 @@ def test_mutation_plugin_perform_mutation_handles_custom_execution_result(
     }
 
 
-@mock.patch.object(
-    PluginSample,
-    "perform_mutation",
-    return_value=ExecutionResult(data={}, errors=[GraphQLError("My Custom Error")]),
-)
 def test_mutation_calls_plugin_perform_mutation_after_permission_checks(
-    mocked_plugin,
-    request,
-    settings,
+    monkeypatch,
     staff_user,
-    plugin_configuration,
-    product,
+    product_global_id,
+    sample_plugin_context,
     channel_USD,
     permission_manage_products,
 ):
@@ -279,19 +285,19 @@ def test_mutation_calls_plugin_perform_mutation_after_permission_checks(
         }
     """
 
-    settings.PLUGINS = [
-        "saleor.plugins.tests.sample_plugins.PluginSample",
-    ]
-
-    schema_context = request.getfixturevalue("schema_context")
-    schema_context.user = staff_user
+    execution_result = ExecutionResult(
+        data={}, errors=[GraphQLError("My Custom Error")]
+    )
+    monkeypatch.setattr(
+        PluginSample, "perform_mutation", lambda *args, **kw: execution_result
+    )
+    sample_plugin_context.user = staff_user
 
-    product_id = graphene.Node.to_global_id("Product", product.pk)
-    variables = {"productId": product_id, "channel": channel_USD.slug}
+    variables = {"productId": product_global_id, "channel": channel_USD.slug}
 
     # When permission is missing, it should not return the custom error from plugin
-    result = schema.execute(
-        mutation_query, variables=variables, context_value=schema_context
+    result = _exec(
+        mutation_query, variables=variables, context_value=sample_plugin_context
     )
     assert len(result.errors) == 1, result.to_dict()
     assert result.errors[0].message == (
@@ -300,9 +306,9 @@ def test_mutation_calls_plugin_perform_mutation_after_permission_checks(
 
     # When permission is not missing, the execution of the plugin should happen
     staff_user.user_permissions.set([permission_manage_products])
-    del staff_user._perm_cache  # force django to re-fetch permissions
-    result = schema.execute(
-        mutation_query, variables=variables, context_value=schema_context
+    _reset_perm_cache(staff_user)
+    result = _exec(
+        mutation_query, variables=variables, context_value=sample_plugin_context
     )
     assert len(result.errors) == 1, result.to_dict()
     assert result.errors[0].message == "My Custom Error"
@@ -9,7 +9,7 @@ from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import JSONField  # type: ignore
-from django.db.models import F, Max
+from django.db.models import F, Max, Prefetch
 from django.db.models.expressions import Exists, OuterRef
 from django.utils.timezone import now
 from django_measurement.models import MeasurementField
@@ -645,6 +645,14 @@ class Fulfillment(ModelWithMetadata):
         return bool(match(r"^[-\w]+://", self.tracking_number))
 
 
+class FulfillmentLineQueryset(models.QuerySet):
+    def with_gift_cards(self):
+        # `fulfillment_line_id` must stay loaded, otherwise Django fetches it
+        # separately for every gift card when matching them to the lines
+        gift_cards = GiftCard.objects.only("id", "code", "fulfillment_line_id")
+        return self.prefetch_related(Prefetch("gift_cards", queryset=gift_cards))
+
+
 class FulfillmentLine(models.Model):
     order_line = models.ForeignKey(
         OrderLine, related_name="fulfillment_lines", on_delete=models.CASCADE
@@ -661,6 +669,8 @@ class FulfillmentLine(models.Model):
         null=True,
     )
 
+    objects = models.Manager.from_queryset(FulfillmentLineQueryset)()
+
 
 class OrderEvent(models.Model):
     """Model used to store events that happened during the order lifecycle.
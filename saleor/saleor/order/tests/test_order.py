@@ -34,7 +34,7 @@ from ..events import (
     event_order_refunded_notification,
     event_payment_confirmed_notification,
 )
-from ..models import Order
+from ..models import FulfillmentLine, Order
 from ..notifications import (
     get_default_fulfillment_payload,
     send_fulfillment_confirmation_to_customer,
@@ -1319,3 +1319,25 @@ def test_available_collection_points_for_preorders_and_regular_variants_in_order
         expected_collection_points
         == response_content["data"]["order"]["availableCollectionPoints"]
     )
+
+
+def test_fulfillment_line_with_gift_cards(
+    gift_card, fulfillment, django_assert_num_queries
+):
+    # given
+    fulfillment_line = fulfillment.lines.first()
+    gift_card.fulfillment_line = fulfillment_line
+    gift_card.save(update_fields=["fulfillment_line"])
+
+    # when
+    with django_assert_num_queries(2):
+        lines = list(
+            FulfillmentLine.objects.filter(fulfillment=fulfillment).with_gift_cards()
+        )
+        codes = {
+            line.pk: [card.code for card in line.gift_cards.all()] for line in lines
+        }
+
+    # then
+    assert codes[fulfillment_line.pk] == [gift_card.code]
+    assert len(codes) == fulfillment.lines.count()